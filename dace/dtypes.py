@@ -1418,8 +1418,8 @@ def paramdec(dec):
 
 
 def deduplicate(iterable):
-    """ Removes duplicates in the passed iterable. """
-    return type(iterable)([i for i in sorted(set(iterable), key=lambda x: iterable.index(x))])
+    """ Removes duplicates in the passed iterable, keeping the first occurrence of each element. """
+    return type(iterable)(dict.fromkeys(iterable))
 
 
 namere = re.compile(r'^[a-zA-Z_][a-zA-Z_0-9]*$')
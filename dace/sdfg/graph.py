@@ -693,10 +693,10 @@ class OrderedDiGraph(Graph[NodeT, EdgeT], Generic[NodeT, EdgeT]):
         del self._edges[t]
 
     def in_degree(self, node):
-        return self._nx.in_degree(node)
+        return len(self._nodes[node][0])
 
     def out_degree(self, node):
-        return self._nx.out_degree(node)
+        return len(self._nodes[node][1])
 
     def number_of_nodes(self):
         return len(self._nodes)
@@ -723,7 +723,7 @@ class OrderedDiGraph(Graph[NodeT, EdgeT], Generic[NodeT, EdgeT]):
     def edges_between(self, source: NodeT, destination: NodeT) -> List[Edge[EdgeT]]:
         if (source, destination) in self._edges:
             return [self._edges[(source, destination)]]
-        if source not in self.nodes(): return []
+        if source not in self._nodes: return []
         return [e for e in self.out_edges(source) if e.dst == destination]
 
     def reverse(self):
@@ -6,79 +6,110 @@ from dace.sdfg import nodes, scope
 from dace.sdfg import utils as sdutil
 from dace.transformation import transformation, helpers as xfh
 from dace.properties import Property, make_properties
-from collections import defaultdict
+from collections import defaultdict, deque
 from copy import deepcopy as dc
 from sympy import floor
-from typing import Dict
+from typing import Dict, FrozenSet, List, Tuple
 
-gpu_storage = [dtypes.StorageType.GPU_Global, dtypes.StorageType.GPU_Shared, dtypes.StorageType.CPU_Pinned]
+gpu_storage = frozenset({dtypes.StorageType.GPU_Global, dtypes.StorageType.GPU_Shared, dtypes.StorageType.CPU_Pinned})
 
 
-def _recursive_out_check(node, state, gpu_scalars):
+def _name_set(names: str) -> FrozenSet[str]:
+    """ Converts a comma-separated list of names to a set, ignoring whitespace and empty entries. """
+    return frozenset(n.strip() for n in names.split(',') if n.strip())
+
+
+def _memlet_path_ends(state, edge, paths=None):
+    """
+    Returns the first and last edges of the memlet path that goes through the given edge.
+    If ``paths`` is given, it is used as a cache keyed by edge.
+    """
+    if paths is not None and edge in paths:
+        return paths[edge]
+    path = state.memlet_path(edge)
+    ends = (path[0], path[-1])
+    if paths is not None:
+        paths[edge] = ends
+    return ends
+
+
+def _recursive_out_check(node, state, gpu_scalars, memo=None, paths=None):
     """
     Recursively checks if the outputs of a node are scalars and if they are/should be stored in GPU memory.
+    If ``memo`` is given, results are cached per node; the cache must be cleared when ``gpu_scalars`` changes.
+    ``paths`` is an optional memlet path cache (see ``_memlet_path_ends``).
     """
+    if memo is not None and node in memo:
+        return memo[node]
     scalset = set()
     scalout = True
     sdfg = state.parent
     for e in state.out_edges(node):
-        last_edge = state.memlet_path(e)[-1]
+        _, last_edge = _memlet_path_ends(state, e, paths)
         if isinstance(last_edge.dst, nodes.AccessNode):
             desc = sdfg.arrays[last_edge.dst.data]
             if isinstance(desc, data.Scalar):
                 if desc.storage in gpu_storage or last_edge.dst.data in gpu_scalars:
                     scalout = False
                 scalset.add(last_edge.dst.data)
-                sset, ssout = _recursive_out_check(last_edge.dst, state, gpu_scalars)
-                scalset = scalset.union(sset)
+                sset, ssout = _recursive_out_check(last_edge.dst, state, gpu_scalars, memo, paths)
+                scalset |= sset
                 scalout = scalout and ssout
                 continue
             if desc.shape == (1, ):  # Pseudo-scalar
                 scalout = False
-                sset, ssout = _recursive_out_check(last_edge.dst, state, gpu_scalars)
-                scalset = scalset.union(sset)
+                sset, ssout = _recursive_out_check(last_edge.dst, state, gpu_scalars, memo, paths)
+                scalset |= sset
                 scalout = scalout and ssout
                 continue
             if desc.storage not in gpu_storage and last_edge.data.num_elements() == 1:
-                sset, ssout = _recursive_out_check(last_edge.dst, state, gpu_scalars)
-                scalset = scalset.union(sset)
+                sset, ssout = _recursive_out_check(last_edge.dst, state, gpu_scalars, memo, paths)
+                scalset |= sset
                 scalout = scalout and ssout
                 continue
             scalout = False
+    if memo is not None:
+        memo[node] = (scalset, scalout)
     return scalset, scalout
 
 
-def _recursive_in_check(node, state, gpu_scalars):
+def _recursive_in_check(node, state, gpu_scalars, memo=None, paths=None):
     """
     Recursively checks if the inputs of a node are scalars and if they are/should be stored in GPU memory.
+    If ``memo`` is given, results are cached per node; the cache must be cleared when ``gpu_scalars`` changes.
+    ``paths`` is an optional memlet path cache (see ``_memlet_path_ends``).
     """
+    if memo is not None and node in memo:
+        return memo[node]
     scalset = set()
     scalout = True
     sdfg = state.parent
     for e in state.in_edges(node):
-        last_edge = state.memlet_path(e)[0]
+        last_edge, _ = _memlet_path_ends(state, e, paths)
         if isinstance(last_edge.src, nodes.AccessNode):
             desc = sdfg.arrays[last_edge.src.data]
             if isinstance(desc, data.Scalar):
                 if desc.storage in gpu_storage or last_edge.src.data in gpu_scalars:
                     scalout = False
                 scalset.add(last_edge.src.data)
-                sset, ssout = _recursive_in_check(last_edge.src, state, gpu_scalars)
-                scalset = scalset.union(sset)
+                sset, ssout = _recursive_in_check(last_edge.src, state, gpu_scalars, memo, paths)
+                scalset |= sset
                 scalout = scalout and ssout
                 continue
             if desc.shape == (1, ):  # Pseudo-scalar
                 scalout = False
-                sset, ssout = _recursive_in_check(last_edge.src, state, gpu_scalars)
-                scalset = scalset.union(sset)
+                sset, ssout = _recursive_in_check(last_edge.src, state, gpu_scalars, memo, paths)
+                scalset |= sset
                 scalout = scalout and ssout
                 continue
             if desc.storage not in gpu_storage and last_edge.data.num_elements() == 1:
-                sset, ssout = _recursive_in_check(last_edge.src, state, gpu_scalars)
-                scalset = scalset.union(sset)
+                sset, ssout = _recursive_in_check(last_edge.src, state, gpu_scalars, memo, paths)
+                scalset |= sset
                 scalout = scalout and ssout
                 continue
             scalout = False
+    if memo is not None:
+        memo[node] = (scalset, scalout)
     return scalset, scalout
 
 
@@ -138,18 +169,20 @@ class GPUTransformSDFG(transformation.MultiStateTransformation):
         return [sd.SDFG('_')]
 
     def can_be_applied(self, graph, expr_index, sdfg, permissive=False):
-        for node, _ in sdfg.all_nodes_recursive():
+        # Scope dictionaries of top-level states, computed on demand
+        sdicts = {}
+        for node, parent in sdfg.all_nodes_recursive():
             # Consume scopes are currently unsupported
             if isinstance(node, (nodes.ConsumeEntry, nodes.ConsumeExit)):
                 return False
 
-        for state in sdfg.nodes():
-            schildren = state.scope_children()
-            for node in schildren[None]:
-                # If two top-level tasklets are connected with a code->code
-                # memlet, they will transform into an invalid SDFG
-                if (isinstance(node, nodes.CodeNode)
-                        and any(isinstance(e.dst, nodes.CodeNode) for e in state.out_edges(node))):
+            # If two top-level tasklets are connected with a code->code
+            # memlet, they will transform into an invalid SDFG
+            if (isinstance(node, nodes.CodeNode) and parent.parent is sdfg
+                    and any(isinstance(e.dst, nodes.CodeNode) for e in parent.out_edges(node))):
+                if parent not in sdicts:
+                    sdicts[parent] = parent.scope_dict()
+                if sdicts[parent][node] is None:
                     return False
         return True
 
@@ -159,35 +192,59 @@ class GPUTransformSDFG(transformation.MultiStateTransformation):
         # Step 0: SDFG metadata
 
         # Find all input and output data descriptors
-        input_nodes = []
-        output_nodes = []
+        input_nodes: Dict[str, data.Data] = {}
+        output_nodes: Dict[str, data.Data] = {}
         global_code_nodes: Dict[sd.SDFGState, nodes.Tasklet] = defaultdict(list)
 
         # Propagate memlets to ensure that we can find the true array subsets that are written.
         propagate_memlets_sdfg(sdfg)
 
-        for state in sdfg.nodes():
-            sdict = state.scope_dict()
+        # Scope dictionaries are reused by Steps 0, 4, 5 and 6, which do not add or remove nodes in existing states
+        states = sdfg.nodes()
+        state_sdicts = {state: state.scope_dict() for state in states}
+        # Memlet path endpoints, valid until Step 7 modifies the dataflow graphs
+        memlet_paths = {}
+        # Nodes grouped by type, so that Steps 4-6 do not have to scan every node of every state again. The copy-in
+        # and copy-out states added in Steps 2 and 3 only contain access nodes that these steps leave unchanged.
+        access_nodes: List[Tuple[sd.SDFGState, nodes.AccessNode]] = []
+        scope_nodes: List[Tuple[sd.SDFGState, nodes.Node]] = []
+        tasklets: List[Tuple[sd.SDFGState, nodes.Tasklet]] = []
+        nested_sdfgs: List[Tuple[sd.SDFGState, nodes.NestedSDFG]] = []
+
+        for state in states:
+            sdict = state_sdicts[state]
             for node in state.nodes():
-                if (isinstance(node, nodes.AccessNode) and node.desc(sdfg).transient == False):
-                    if (state.out_degree(node) > 0 and node.data not in input_nodes):
-                        # Special case: nodes that lead to top-level dynamic
-                        # map ranges must stay on host
-                        for e in state.out_edges(node):
-                            last_edge = state.memlet_path(e)[-1]
-                            if (isinstance(last_edge.dst, nodes.EntryNode) and last_edge.dst_conn
-                                    and not last_edge.dst_conn.startswith('IN_') and sdict[last_edge.dst] is None):
-                                break
-                        else:
-                            input_nodes.append((node.data, node.desc(sdfg)))
-                    if (state.in_degree(node) > 0 and node.data not in output_nodes):
-                        output_nodes.append((node.data, node.desc(sdfg)))
+                if isinstance(node, (nodes.EntryNode, nodes.LibraryNode, nodes.NestedSDFG)):
+                    scope_nodes.append((state, node))
+                if isinstance(node, nodes.Tasklet):
+                    tasklets.append((state, node))
+                elif isinstance(node, nodes.NestedSDFG):
+                    nested_sdfgs.append((state, node))
+                if not isinstance(node, nodes.AccessNode):
+                    continue
+                access_nodes.append((state, node))
+                desc = node.desc(sdfg)
+                if desc.transient:
+                    continue
+                if (state.out_degree(node) > 0 and node.data not in input_nodes):
+                    # Special case: nodes that lead to top-level dynamic
+                    # map ranges must stay on host
+                    for e in state.out_edges(node):
+                        _, last_edge = _memlet_path_ends(state, e, memlet_paths)
+                        if (isinstance(last_edge.dst, nodes.EntryNode) and last_edge.dst_conn
+                                and not last_edge.dst_conn.startswith('IN_') and sdict[last_edge.dst] is None):
+                            break
+                    else:
+                        input_nodes[node.data] = desc
+                if (state.in_degree(node) > 0 and node.data not in output_nodes):
+                    output_nodes[node.data] = desc
 
             # Input nodes may also be nodes with WCR memlets and no identity
             for e in state.edges():
-                if e.data.wcr is not None:
-                    if (e.data.data not in input_nodes and sdfg.arrays[e.data.data].transient == False):
-                        input_nodes.append((e.data.data, sdfg.arrays[e.data.data]))
+                if e.data.wcr is not None and e.data.data not in input_nodes:
+                    desc = sdfg.arrays[e.data.data]
+                    if not desc.transient:
+                        input_nodes[e.data.data] = desc
 
         start_state = sdfg.start_state
         end_states = sdfg.sink_nodes()
@@ -198,7 +255,7 @@ class GPUTransformSDFG(transformation.MultiStateTransformation):
         data_already_on_gpu = {}
 
         cloned_arrays = {}
-        for inodename, inode in set(input_nodes):
+        for inodename, inode in input_nodes.items():
             if inode.storage == dtypes.StorageType.GPU_Global:
                 data_already_on_gpu[inodename] = None
                 continue
@@ -210,7 +267,7 @@ class GPUTransformSDFG(transformation.MultiStateTransformation):
             name = sdfg.add_datadesc('gpu_' + inodename, newdesc, find_new_name=True)
             cloned_arrays[inodename] = name
 
-        for onodename, onode in set(output_nodes):
+        for onodename, onode in output_nodes.items():
             if onode.storage == dtypes.StorageType.GPU_Global:
                 data_already_on_gpu[onodename] = None
                 continue
@@ -225,30 +282,29 @@ class GPUTransformSDFG(transformation.MultiStateTransformation):
             # The following ensures that when writing to a subset of an array, we don't overwrite the rest of the array
             # when copying back to the host. This is done by adding the array to the `inputs_nodes,` which will copy
             # the entire array to the GPU.
-            if (onodename, onode) not in input_nodes:
+            if onodename not in input_nodes:
                 found_full_write = False
                 full_subset = sbs.Range.from_array(onode)
                 try:
-                    for state in sdfg.nodes():
-                        for node in state.nodes():
-                            if (isinstance(node, nodes.AccessNode) and node.data == onodename):
-                                for e in state.in_edges(node):
-                                    if e.data.get_dst_subset(e, state) == full_subset:
-                                        is_full = True
-                                        for pe in state.memlet_tree(e):
-                                            vol = pe.data.volume
-                                            size = pe.data.get_dst_subset(pe, state).num_elements()
-                                            if pe.data.dynamic or vol / size != floor(vol / size):
-                                                is_full = False
-                                                break
-                                        if not is_full:
-                                            continue
-                                        found_full_write = True
-                                        raise StopIteration
+                    for state, node in access_nodes:
+                        if node.data == onodename:
+                            for e in state.in_edges(node):
+                                if e.data.get_dst_subset(e, state) == full_subset:
+                                    is_full = True
+                                    for pe in state.memlet_tree(e):
+                                        vol = pe.data.volume
+                                        size = pe.data.get_dst_subset(pe, state).num_elements()
+                                        if pe.data.dynamic or vol / size != floor(vol / size):
+                                            is_full = False
+                                            break
+                                    if not is_full:
+                                        continue
+                                    found_full_write = True
+                                    raise StopIteration
                 except StopIteration:
                     assert found_full_write
                 if not found_full_write:
-                    input_nodes.append((onodename, onode))
+                    input_nodes[onodename] = onode
 
         for edge in sdfg.edges():
             memlets = edge.data.get_read_memlets(sdfg.arrays)
@@ -256,86 +312,86 @@ class GPUTransformSDFG(transformation.MultiStateTransformation):
                 if sdfg.arrays[mem.data].storage == dtypes.StorageType.GPU_Global:
                     data_already_on_gpu[mem.data] = None
 
-        # Replace nodes
-        for state in sdfg.nodes():
-            for node in state.nodes():
-                if (isinstance(node, nodes.AccessNode) and node.data in cloned_arrays):
-                    node.data = cloned_arrays[node.data]
-
-        # Replace memlets
-        for state in sdfg.nodes():
-            for edge in state.edges():
-                if edge.data.data in cloned_arrays:
-                    edge.data.data = cloned_arrays[edge.data.data]
+        # Replace nodes and memlets in a single pass over the states
+        if cloned_arrays:
+            for state in states:
+                for node in state.data_nodes():
+                    cloned = cloned_arrays.get(node.data)
+                    if cloned is not None:
+                        node.data = cloned
+                for edge in state.edges():
+                    cloned = cloned_arrays.get(edge.data.data)
+                    if cloned is not None:
+                        edge.data.data = cloned
 
         #######################################################
         # Step 2: Create copy-in state
-        excluded_copyin = self.exclude_copyin.split(',')
+        excluded_copyin = _name_set(self.exclude_copyin)
 
         copyin_state = sdfg.add_state(sdfg.label + '_copyin')
         sdfg.add_edge(copyin_state, start_state, sd.InterstateEdge())
 
-        for nname, desc in dtypes.deduplicate(input_nodes):
+        for nname, desc in input_nodes.items():
             if nname in excluded_copyin or nname not in cloned_arrays:
                 continue
-            src_array = nodes.AccessNode(nname, debuginfo=desc.debuginfo)
-            dst_array = nodes.AccessNode(cloned_arrays[nname], debuginfo=desc.debuginfo)
+            debuginfo = desc.debuginfo
+            src_array = nodes.AccessNode(nname, debuginfo=debuginfo)
+            dst_array = nodes.AccessNode(cloned_arrays[nname], debuginfo=debuginfo)
             copyin_state.add_node(src_array)
             copyin_state.add_node(dst_array)
-            copyin_state.add_nedge(src_array, dst_array, memlet.Memlet.from_array(src_array.data, src_array.desc(sdfg)))
+            # The host descriptor is already known, no need to look it up through the access node
+            copyin_state.add_nedge(src_array, dst_array, memlet.Memlet.from_array(nname, desc))
 
         #######################################################
         # Step 3: Create copy-out state
-        excluded_copyout = self.exclude_copyout.split(',')
+        excluded_copyout = _name_set(self.exclude_copyout)
 
         copyout_state = sdfg.add_state(sdfg.label + '_copyout')
         for state in end_states:
             sdfg.add_edge(state, copyout_state, sd.InterstateEdge())
 
-        for nname, desc in dtypes.deduplicate(output_nodes):
+        for nname, desc in output_nodes.items():
             if nname in excluded_copyout or nname not in cloned_arrays:
                 continue
-            src_array = nodes.AccessNode(cloned_arrays[nname], debuginfo=desc.debuginfo)
-            dst_array = nodes.AccessNode(nname, debuginfo=desc.debuginfo)
+            debuginfo = desc.debuginfo
+            src_array = nodes.AccessNode(cloned_arrays[nname], debuginfo=debuginfo)
+            dst_array = nodes.AccessNode(nname, debuginfo=debuginfo)
             copyout_state.add_node(src_array)
             copyout_state.add_node(dst_array)
-            copyout_state.add_nedge(src_array, dst_array, memlet.Memlet.from_array(dst_array.data,
-                                                                                   dst_array.desc(sdfg)))
+            copyout_state.add_nedge(src_array, dst_array, memlet.Memlet.from_array(nname, desc))
 
         #######################################################
         # Step 4: Change all top-level maps and library nodes to GPU schedule
 
         gpu_nodes = set()
-        for state in sdfg.nodes():
-            sdict = state.scope_dict()
-            for node in state.nodes():
-                if sdict[node] is None:
-                    if isinstance(node, (nodes.LibraryNode, nodes.NestedSDFG)):
-                        node.schedule = dtypes.ScheduleType.GPU_Default
-                        gpu_nodes.add((state, node))
-                    elif isinstance(node, nodes.EntryNode):
-                        node.schedule = dtypes.ScheduleType.GPU_Device
-                        gpu_nodes.add((state, node))
-                elif self.sequential_innermaps:
-                    if isinstance(node, (nodes.EntryNode, nodes.LibraryNode)):
-                        node.schedule = dtypes.ScheduleType.Sequential
-                    elif isinstance(node, nodes.NestedSDFG):
-                        for nnode, _ in node.sdfg.all_nodes_recursive():
-                            if isinstance(nnode, (nodes.EntryNode, nodes.LibraryNode)):
-                                nnode.schedule = dtypes.ScheduleType.Sequential
+        for state, node in scope_nodes:
+            if state_sdicts[state][node] is None:
+                if isinstance(node, (nodes.LibraryNode, nodes.NestedSDFG)):
+                    node.schedule = dtypes.ScheduleType.GPU_Default
+                    gpu_nodes.add((state, node))
+                elif isinstance(node, nodes.EntryNode):
+                    node.schedule = dtypes.ScheduleType.GPU_Device
+                    gpu_nodes.add((state, node))
+            elif self.sequential_innermaps:
+                if isinstance(node, (nodes.EntryNode, nodes.LibraryNode)):
+                    node.schedule = dtypes.ScheduleType.Sequential
+                elif isinstance(node, nodes.NestedSDFG):
+                    for nnode, _ in node.sdfg.all_nodes_recursive():
+                        if isinstance(nnode, (nodes.EntryNode, nodes.LibraryNode)):
+                            nnode.schedule = dtypes.ScheduleType.Sequential
 
         # NOTE: The outputs of LibraryNodes, NestedSDFGs and Map that have GPU schedule must be moved to GPU memory.
         # TODO: Also use GPU-shared and GPU-register memory when appropriate.
         for state, node in gpu_nodes:
             if isinstance(node, (nodes.LibraryNode, nodes.NestedSDFG)):
                 for e in state.out_edges(node):
-                    dst = state.memlet_path(e)[-1].dst
+                    dst = _memlet_path_ends(state, e, memlet_paths)[1].dst
                     if isinstance(dst, nodes.AccessNode):
                         desc = sdfg.arrays[dst.data]
                         desc.storage = dtypes.StorageType.GPU_Global
             if isinstance(node, nodes.EntryNode):
                 for e in state.out_edges(state.exit_node(node)):
-                    dst = state.memlet_path(e)[-1].dst
+                    dst = _memlet_path_ends(state, e, memlet_paths)[1].dst
                     if isinstance(dst, nodes.AccessNode):
                         desc = sdfg.arrays[dst.data]
                         desc.storage = dtypes.StorageType.GPU_Global
@@ -347,49 +403,65 @@ class GPUTransformSDFG(transformation.MultiStateTransformation):
 
         gpu_scalars = {}
         nsdfgs = []
-        changed = True
+        # Memoized results of the recursive scalar checks, valid until gpu_scalars changes
+        out_memo = {}
+        in_memo = {}
+        # Tasklets of NestedSDFGs that have a GPU-Device schedule but are not in a GPU kernel are always moved to the
+        # GPU. This only depends on the SDFG, so it is evaluated once instead of per tasklet.
+        in_gpu_nsdfg = (sdfg.parent is not None and sdfg.parent_nsdfg_node.schedule == dtypes.ScheduleType.GPU_Default)
+
         # Iterates over Tasklets that not inside a GPU kernel. Such Tasklets must be moved inside a GPU kernel only
         # if they write to GPU memory. The check takes into account the fact that GPU kernels can read host-based
         # Scalars, but cannot write to them.
-        while changed:
-            changed = False
-            for state in sdfg.states():
-                for node in state.nodes():
-                    # Handle NestedSDFGs later.
-                    if isinstance(node, nodes.NestedSDFG):
-                        if state.entry_node(node) is None and not scope.is_devicelevel_gpu_kernel(
-                                state.parent, state, node):
-                            nsdfgs.append((node, state))
-                    elif isinstance(node, nodes.Tasklet):
-                        if node in global_code_nodes[state]:
-                            continue
-                        if state.entry_node(node) is None and not scope.is_devicelevel_gpu_kernel(
-                                state.parent, state, node):
-                            scalars, scalar_output = _recursive_out_check(node, state, gpu_scalars)
-                            sset, ssout = _recursive_in_check(node, state, gpu_scalars)
-                            scalars = scalars.union(sset)
-                            scalar_output = scalar_output and ssout
-                            csdfg = state.parent
-                            # If the tasklet is not adjacent only to scalars or it is in a GPU scope.
-                            # The latter includes NestedSDFGs that have a GPU-Device schedule but are not in a GPU kernel.
-                            if (not scalar_output
-                                    or (csdfg.parent is not None
-                                        and csdfg.parent_nsdfg_node.schedule == dtypes.ScheduleType.GPU_Default)):
-                                global_code_nodes[state].append(node)
-                                gpu_scalars.update({k: None for k in scalars})
-                                changed = True
+        # Only top-level nodes are considered, for which being in a GPU kernel depends on the state alone
+        state_devicelevel = {state: scope.is_devicelevel_gpu_kernel(sdfg, state, None) for state in states}
+        worklist = deque()
+        for state, node in tasklets:
+            if state_sdicts[state][node] is None and not state_devicelevel[state]:
+                worklist.append((node, state))
+        # Handle NestedSDFGs later.
+        for state, node in nested_sdfgs:
+            if state_sdicts[state][node] is None and not state_devicelevel[state]:
+                nsdfgs.append((node, state))
+
+        # The outcome of the check only changes when one of the scalars adjacent to the tasklet is moved to the GPU.
+        # Tasklets that stay on the host are therefore only revisited when that happens.
+        global_tasklets = set()
+        scalar_to_tasklets: Dict[str, List[Tuple[nodes.Tasklet, sd.SDFGState]]] = defaultdict(list)
+        while worklist:
+            node, state = worklist.popleft()
+            if node in global_tasklets:
+                continue
+            scalars, scalar_output = _recursive_out_check(node, state, gpu_scalars, out_memo, memlet_paths)
+            sset, ssout = _recursive_in_check(node, state, gpu_scalars, in_memo, memlet_paths)
+            scalars = scalars.union(sset)
+            scalar_output = scalar_output and ssout
+            # If the tasklet is not adjacent only to scalars or it is in a GPU scope.
+            if not scalar_output or in_gpu_nsdfg:
+                global_code_nodes[state].append(node)
+                global_tasklets.add(node)
+                new_scalars = [k for k in scalars if k not in gpu_scalars]
+                if new_scalars:
+                    out_memo.clear()
+                    in_memo.clear()
+                    for k in new_scalars:
+                        gpu_scalars[k] = None
+                        worklist.extend(scalar_to_tasklets.pop(k, []))
+            else:
+                for k in scalars:
+                    scalar_to_tasklets[k].append((node, state))
 
         # Apply GPUTransformSDFG recursively to NestedSDFGs.
         for node, state in nsdfgs:
             excl_copyin = set()
             for e in state.in_edges(node):
-                src = state.memlet_path(e)[0].src
+                src = _memlet_path_ends(state, e, memlet_paths)[0].src
                 if isinstance(src, nodes.AccessNode) and sdfg.arrays[src.data].storage in gpu_storage:
                     excl_copyin.add(e.dst_conn)
                     node.sdfg.arrays[e.dst_conn].storage = sdfg.arrays[src.data].storage
             excl_copyout = set()
             for e in state.out_edges(node):
-                dst = state.memlet_path(e)[-1].dst
+                dst = _memlet_path_ends(state, e, memlet_paths)[1].dst
                 if isinstance(dst, nodes.AccessNode) and sdfg.arrays[dst.data].storage in gpu_storage:
                     excl_copyout.add(e.src_conn)
                     node.sdfg.arrays[e.src_conn].storage = sdfg.arrays[dst.data].storage
@@ -405,41 +477,54 @@ class GPUTransformSDFG(transformation.MultiStateTransformation):
 
         const_syms = xfh.constant_symbols(sdfg)
 
-        for state in sdfg.nodes():
-            sdict = state.scope_dict()
-            for node in state.nodes():
-                if isinstance(node, nodes.AccessNode) and node.desc(sdfg).transient:
-                    nodedesc = node.desc(sdfg)
+        # Storage changes are collected per data descriptor and applied after the scan. Transients that appear at the
+        # top level of any state go to global GPU memory, even if they are also accessed inside a scope.
+        to_gpu: Dict[str, data.Data] = {}
+        to_register: Dict[str, data.Data] = {}
 
-                    # Special case: nodes that lead to dynamic map ranges must stay on host
-                    if any(isinstance(state.memlet_path(e)[-1].dst, nodes.EntryNode) for e in state.out_edges(node)):
-                        continue
+        for state, node in access_nodes:
+            if node.data in to_gpu:
+                continue
+            nodedesc = node.desc(sdfg)
+            if not nodedesc.transient or nodedesc.storage in gpu_storage:
+                continue
 
-                    if sdict[node] is None and nodedesc.storage not in gpu_storage:
+            # Special case: nodes that lead to dynamic map ranges must stay on host
+            if any(
+                    isinstance(_memlet_path_ends(state, e, memlet_paths)[1].dst, nodes.EntryNode)
+                    for e in state.out_edges(node)):
+                continue
 
-                        # Scalars were already checked.
-                        if isinstance(nodedesc, data.Scalar) and not node.data in gpu_scalars:
-                            continue
+            if state_sdicts[state][node] is None:
+                # Scalars were already checked.
+                if isinstance(nodedesc, data.Scalar) and not node.data in gpu_scalars:
+                    continue
 
-                        # NOTE: the cloned arrays match too but it's the same storage so we don't care
-                        nodedesc.storage = dtypes.StorageType.GPU_Global
+                # NOTE: the cloned arrays match too but it's the same storage so we don't care
+                to_gpu[node.data] = nodedesc
+            elif self.register_trans:
+                # Make internal transients registers
+                to_register[node.data] = nodedesc
 
-                        # Try to move allocation/deallocation out of loops
-                        dsyms = set(map(str, nodedesc.free_symbols))
-                        if (self.toplevel_trans and not isinstance(nodedesc, (data.Stream, data.View))
-                                and len(dsyms - const_syms) == 0):
-                            nodedesc.lifetime = dtypes.AllocationLifetime.SDFG
-                    elif nodedesc.storage not in gpu_storage:
-                        # Make internal transients registers
-                        if self.register_trans:
-                            nodedesc.storage = dtypes.StorageType.Register
+        for nodedesc in to_gpu.values():
+            nodedesc.storage = dtypes.StorageType.GPU_Global
+
+            # Try to move allocation/deallocation out of loops
+            dsyms = set(map(str, nodedesc.free_symbols))
+            if (self.toplevel_trans and not isinstance(nodedesc, (data.Stream, data.View))
+                    and len(dsyms - const_syms) == 0):
+                nodedesc.lifetime = dtypes.AllocationLifetime.SDFG
+        for dname, nodedesc in to_register.items():
+            if dname not in to_gpu:
+                nodedesc.storage = dtypes.StorageType.Register
 
         #######################################################
         # Step 7: Wrap free tasklets and nested SDFGs with a GPU map
 
+        excluded_tasklets = _name_set(self.exclude_tasklets)
         for state, gcodes in global_code_nodes.items():
             for gcode in gcodes:
-                if gcode.label in self.exclude_tasklets.split(','):
+                if gcode.label in excluded_tasklets:
                     continue
                 # Create map and connectors
                 me, mx = state.add_map(gcode.label + '_gmap', {gcode.label + '__gmapi': '0:1'},
@@ -471,25 +556,29 @@ class GPUTransformSDFG(transformation.MultiStateTransformation):
 
         cloned_data = set(cloned_arrays.keys()).union(gpu_scalars.keys()).union(data_already_on_gpu.keys())
 
-        for state in list(sdfg.nodes()):
+        # Free symbols of each interstate edge, computed once. Keyed by the edge data, which is preserved when edges
+        # are reconnected below.
+        edge_symbols = {e.data: e.data.free_symbols for e in sdfg.edges()}
+
+        # nodes() returns a copy, so the interim copy-out states added below are not revisited
+        for state in sdfg.nodes():
             arrays_used = set()
             for e in sdfg.out_edges(state):
                 # Used arrays = intersection between symbols and cloned data
-                arrays_used.update(set(e.data.free_symbols) & cloned_data)
+                arrays_used.update(edge_symbols[e.data] & cloned_data)
 
             # Create a state and copy out used arrays
             if len(arrays_used) > 0:
 
                 co_state = sdfg.add_state(state.label + '_icopyout')
 
-                # Reconnect outgoing edges to after interim copyout state
-                for e in sdfg.out_edges(state):
-                    sdutil.change_edge_src(sdfg, state, co_state)
+                # Reconnect outgoing edges to after interim copyout state (moves all of them at once)
+                sdutil.change_edge_src(sdfg, state, co_state)
                 # Add unconditional edge to interim state
                 sdfg.add_edge(state, co_state, sd.InterstateEdge())
 
-                # Add copy-out nodes
-                for nname in arrays_used:
+                # Add copy-out nodes. The set is sorted so that the copies are created in a deterministic order.
+                for nname in sorted(arrays_used):
 
                     # Handle GPU scalars
                     if nname in gpu_scalars:
@@ -523,10 +612,11 @@ class GPUTransformSDFG(transformation.MultiStateTransformation):
                     dst_array = nodes.AccessNode(hostname, debuginfo=desc.debuginfo)
                     co_state.add_node(src_array)
                     co_state.add_node(dst_array)
-                    co_state.add_nedge(src_array, dst_array,
-                                       memlet.Memlet.from_array(dst_array.data, dst_array.desc(sdfg)))
+                    # desc is the descriptor of the host data in all three cases above
+                    co_state.add_nedge(src_array, dst_array, memlet.Memlet.from_array(hostname, desc))
                     for e in sdfg.out_edges(co_state):
-                        e.data.replace(devicename, hostname, False)
+                        if devicename in edge_symbols[e.data]:
+                            e.data.replace(devicename, hostname, False)
 
         # Step 9: Simplify
         if not self.simplify:
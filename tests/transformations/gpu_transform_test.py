@@ -119,9 +119,98 @@ def test_write_subset_dynamic():
     assert np.array_equal(ref, val)
 
 
+def test_scalar_chain():
+    """
+    A chain of free tasklets connected through transient scalars must be moved to the GPU in its entirety if the
+    last tasklet writes to GPU memory.
+    """
+    sdfg = dace.SDFG('scalar_chain')
+    sdfg.add_array('A', [1], dace.float64)
+    sdfg.add_scalar('s1', dace.float64, transient=True)
+    sdfg.add_scalar('s2', dace.float64, transient=True)
+    state = sdfg.add_state()
+    t1 = state.add_tasklet('t1', {}, {'out'}, 'out = 1')
+    t2 = state.add_tasklet('t2', {'inp'}, {'out'}, 'out = inp + 1')
+    t3 = state.add_tasklet('t3', {'inp'}, {'out'}, 'out = inp * 2')
+    s1 = state.add_access('s1')
+    s2 = state.add_access('s2')
+    state.add_edge(t1, 'out', s1, None, dace.Memlet('s1[0]'))
+    state.add_edge(s1, None, t2, 'inp', dace.Memlet('s1[0]'))
+    state.add_edge(t2, 'out', s2, None, dace.Memlet('s2[0]'))
+    state.add_edge(s2, None, t3, 'inp', dace.Memlet('s2[0]'))
+    state.add_edge(t3, 'out', state.add_write('A'), None, dace.Memlet('A[0]'))
+
+    sdfg.apply_transformations(GPUTransformSDFG, options=dict(simplify=False))
+
+    for tasklet in (t1, t2, t3):
+        assert state.entry_node(tasklet).schedule == dace.ScheduleType.GPU_Device
+    assert sdfg.arrays['s1'].storage == dace.StorageType.GPU_Global
+    assert sdfg.arrays['s2'].storage == dace.StorageType.GPU_Global
+
+
+def test_nested_sdfg_transformed_once():
+    """
+    A top-level NestedSDFG must be transformed exactly once, even if free tasklets in the same SDFG are moved to the
+    GPU. Transforming it again would copy the host copies of its GPU data out once more.
+    """
+    nsdfg = dace.SDFG('nested')
+    nsdfg.add_array('B', [1], dace.float64)
+    nsdfg.add_array('C', [1], dace.float64)
+    nsdfg.add_symbol('x', dace.float64)
+    s0 = nsdfg.add_state('s0')
+    s1 = nsdfg.add_state('s1')
+    nsdfg.add_edge(s0, s1, dace.InterstateEdge(assignments={'x': 'B[0]'}))
+    t = s1.add_tasklet('t', {}, {'out'}, 'out = x')
+    s1.add_edge(t, 'out', s1.add_write('C'), None, dace.Memlet('C[0]'))
+
+    sdfg = dace.SDFG('nested_sdfg_transformed_once')
+    sdfg.add_array('A', [1], dace.float64)
+    sdfg.add_array('B', [1], dace.float64)
+    sdfg.add_array('C', [1], dace.float64)
+    sdfg.add_scalar('s', dace.float64, transient=True)
+    state = sdfg.add_state()
+    nnode = state.add_nested_sdfg(nsdfg, sdfg, {'B'}, {'C'})
+    state.add_edge(state.add_read('B'), None, nnode, 'B', dace.Memlet('B[0]'))
+    state.add_edge(nnode, 'C', state.add_write('C'), None, dace.Memlet('C[0]'))
+    # The second tasklet writes to GPU memory and is moved to the GPU along with the first one through the scalar
+    t1 = state.add_tasklet('t1', {}, {'out'}, 'out = 1')
+    t2 = state.add_tasklet('t2', {'inp'}, {'out'}, 'out = inp')
+    s = state.add_access('s')
+    state.add_edge(t1, 'out', s, None, dace.Memlet('s[0]'))
+    state.add_edge(s, None, t2, 'inp', dace.Memlet('s[0]'))
+    state.add_edge(t2, 'out', state.add_write('A'), None, dace.Memlet('A[0]'))
+
+    sdfg.apply_transformations(GPUTransformSDFG)
+    sdfg.validate()
+
+    assert [name for name in nsdfg.arrays if name.startswith('host_')] == ['host_B']
+    assert all('B' not in e.data.free_symbols for e in nsdfg.edges())
+
+
+@pytest.mark.parametrize('exclude_copyout, copied_out', [('A, B', set()), ('', {'A', 'B'})])
+def test_exclude_copyout(exclude_copyout, copied_out):
+    """ Names in the exclude lists may be surrounded by whitespace, and an empty list excludes nothing. """
+    sdfg = dace.SDFG('exclude_copyout')
+    sdfg.add_array('A', [1], dace.float64)
+    sdfg.add_array('B', [1], dace.float64)
+    state = sdfg.add_state()
+    t = state.add_tasklet('t', {}, {'a', 'b'}, 'a = 1; b = 2')
+    state.add_edge(t, 'a', state.add_write('A'), None, dace.Memlet('A[0]'))
+    state.add_edge(t, 'b', state.add_write('B'), None, dace.Memlet('B[0]'))
+
+    sdfg.apply_transformations(GPUTransformSDFG, options=dict(exclude_copyout=exclude_copyout, simplify=False))
+
+    copyout_state = next(s for s in sdfg.nodes() if s.label == 'exclude_copyout_copyout')
+    assert {n.data for n in copyout_state.sink_nodes()} == copied_out
+
+
 if __name__ == '__main__':
     test_toplevel_transient_lifetime()
     test_scalar_to_symbol_in_nested_sdfg()
     test_write_subset()
     test_write_full()
     test_write_subset_dynamic()
+    test_scalar_chain()
+    test_nested_sdfg_transformed_once()
+    test_exclude_copyout('A, B', set())
+    test_exclude_copyout('', {'A', 'B'})